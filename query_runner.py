@@ -3,21 +3,87 @@
 Query Runner - Execute SQL queries from a file and save results to CSV
 """
 
+import aiomysql
+import asyncio
 import mysql.connector
+from mysql.connector.constants import ClientFlag, FieldType
 import csv
+import io
 import os
+import queue
 import sys
 from datetime import datetime, timedelta
 from pathlib import Path
+from collections import deque, namedtuple
+from itertools import islice
+import threading
 import argparse
+import base64
+import json
+import lz4.frame
 from dotenv import load_dotenv
 import re
+import sqlparse
+
+# Optional fast CSV writers
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Number of rows pulled from the server per fetchmany() call when streaming results
+FETCH_BATCH_SIZE = 10000
+
+# Write buffer for output CSV files; large enough to turn many small row writes into few syscalls
+OUTPUT_BUFFER_SIZE = 1 << 20
+
+# Encoded CSV chunks allowed to wait for the background writer thread
+WRITE_QUEUE_SIZE = 4
+
+# Default number of batches queried concurrently in day-by-day processing
+DEFAULT_MAX_WORKERS = 16
+
+# Default number of consecutive days combined into one query in day-by-day processing
+DEFAULT_BATCH_DAYS = 7
+
+# Date SET statements: extraction of the configured range
+_START_RE = re.compile(r'SET\s+@start_date\s*=\s*["\'](\d{4}-\d{2}-\d{2})["\']', re.IGNORECASE)
+_END_RE = re.compile(r'SET\s+@end_date\s*=\s*["\'](\d{4}-\d{2}-\d{2})["\']', re.IGNORECASE)
+
+# References to the date variables, replaced by bound parameters in day-by-day processing
+_DATE_VAR_RE = re.compile(r'@(start|end)_date', re.IGNORECASE)
+_DATE_VARIABLES = {'start_date', 'end_date'}
+
+# Column types whose raw text-protocol bytes are valid CSV fields as-is (no commas, quotes or newlines)
+_RAW_SAFE_TYPES = (
+    set(FieldType.get_number_types()) | set(FieldType.get_timestamp_types())
+    | {FieldType.DATE, FieldType.NEWDATE, FieldType.TIME}
+) - {FieldType.BIT}
+
+# Integers up to this magnitude are exact in float64
+_FLOAT64_EXACT_INT = 1 << 53
+
+# Parsed SQL file, analysed once per run (see build_query_plan)
+_QueryPlan = namedtuple('_QueryPlan', [
+    'queries', 'prelude_sets', 'day_statements', 'per_day', 'unionable', 'start_date', 'end_date'
+])
+
+# CSV writer used when --writer is not given: Arrow when installed, else the csv module
+DEFAULT_WRITER = 'arrow' if pa is not None else 'csv'
 
 
 def parse_sql_file(sql_file_path):
     """
     Parse SQL file and extract individual queries.
-    Supports multiple queries separated by semicolons.
+    Supports multiple queries separated by semicolons; semicolons inside
+    string literals and comments don't split a query.
     
     Args:
         sql_file_path: Path to the SQL file
@@ -26,15 +92,48 @@ def parse_sql_file(sql_file_path):
         List of SQL query strings
     """
     with open(sql_file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
+        # Split into statements with sqlparse's tokenizer and filter out empty queries
+        queries = [statement_text(statement) for statement in sqlparse.parsestream(f)]
+    
+    return [q for q in queries if q]
+
+
+def statement_text(statement):
+    """
+    Render a parsed statement without its terminating semicolon.
+    Trailing whitespace and comments on either side of the semicolon are
+    dropped too, so the query can be wrapped in parentheses or joined with
+    others without a comment swallowing what follows.
     
-    # Split by semicolon and filter out empty queries
-    queries = [q.strip() for q in content.split(';') if q.strip()]
+    Args:
+        statement: sqlparse Statement
+        
+    Returns:
+        SQL query string
+    """
+    tokens = list(statement.flatten())
+    while tokens and (tokens[-1].is_whitespace or tokens[-1].ttype in sqlparse.tokens.Comment
+                      or tokens[-1].match(sqlparse.tokens.Punctuation, ';')):
+        tokens.pop()
     
-    return queries
+    return ''.join(token.value for token in tokens).strip()
 
 
-def connect_to_database(host, user, password, database, port=3306):
+def require_c_extension():
+    """
+    Exit with an error if mysql-connector-python's C extension is unavailable.
+    connect_to_database opens its connection with use_pure=False, since the
+    pure-Python protocol implementation is several times slower at unpacking
+    result rows. Day-by-day processing uses aiomysql (see create_connection_pool),
+    which is pure Python and doesn't need it.
+    """
+    if not mysql.connector.HAVE_CEXT:
+        print("✗ Error: mysql-connector-python C extension (_mysql_connector) is not available")
+        print("  Install a binary wheel: pip install --force-reinstall mysql-connector-python")
+        sys.exit(1)
+
+
+def connect_to_database(host, user, password, database, port=3306, multi_statements=False):
     """
     Establish connection to MySQL database.
     
@@ -44,17 +143,22 @@ def connect_to_database(host, user, password, database, port=3306):
         password: Database password
         database: Database name
         port: Database port (default: 3306)
+        multi_statements: Allow several statements per query (see execute_queries_to_csv)
         
     Returns:
         MySQL connection object
     """
+    require_c_extension()
+    client_flags = [ClientFlag.MULTI_STATEMENTS, ClientFlag.MULTI_RESULTS] if multi_statements else []
     try:
         connection = mysql.connector.connect(
             host=host,
             user=user,
             password=password,
             database=database,
-            port=port
+            port=port,
+            client_flags=client_flags,
+            use_pure=False
         )
         print(f"✓ Connected to database: {database}")
         return connection
@@ -63,6 +167,69 @@ def connect_to_database(host, user, password, database, port=3306):
         sys.exit(1)
 
 
+async def create_connection_pool(host, user, password, database, port=3306, pool_size=DEFAULT_MAX_WORKERS):
+    """
+    Create an asyncio pool of MySQL connections for running queries concurrently.
+    Connections use autocommit: aiomysql closes a connection that is still in a
+    transaction when it's released instead of returning it to the pool.
+    Queries go over the text protocol, with parameters escaped client-side.
+    
+    Args:
+        host: Database host
+        user: Database user
+        password: Database password
+        database: Database name
+        port: Database port (default: 3306)
+        pool_size: Maximum number of connections in the pool
+        
+    Returns:
+        aiomysql connection pool object
+    """
+    try:
+        pool = await aiomysql.create_pool(
+            host=host,
+            user=user,
+            password=password,
+            db=database,
+            port=port,
+            minsize=1,
+            maxsize=pool_size,
+            autocommit=True
+        )
+        print(f"✓ Connected to database: {database} (pool of up to {pool_size} connections)")
+        return pool
+    except aiomysql.Error as err:
+        print(f"✗ Error connecting to database: {err}")
+        sys.exit(1)
+
+
+def parse_date(value):
+    """
+    Parse a YYYY-MM-DD string (as matched by _START_RE/_END_RE) without going
+    through strptime's format interpreter.
+    
+    Args:
+        value: Date string in YYYY-MM-DD format
+        
+    Returns:
+        datetime object at midnight of that date
+    """
+    return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]))
+
+
+def format_date(value):
+    """
+    Format a date as YYYY-MM-DD without going through strftime.
+    
+    Args:
+        value: datetime or date object
+        
+    Returns:
+        Date string in YYYY-MM-DD format
+    """
+    return f'{value.year:04d}-{value.month:02d}-{value.day:02d}'
+
+
 def extract_date_range(queries):
     """
     Extract start and end dates from SET statements in queries.
@@ -78,14 +245,14 @@ def extract_date_range(queries):
     
     for query in queries:
         # Match SET @start_date = "YYYY-MM-DD"
-        start_match = re.search(r'SET\s+@start_date\s*=\s*["\'](\d{4}-\d{2}-\d{2})["\']', query, re.IGNORECASE)
+        start_match = _START_RE.search(query)
         if start_match:
-            start_date = datetime.strptime(start_match.group(1), '%Y-%m-%d')
+            start_date = parse_date(start_match.group(1))
         
         # Match SET @end_date = "YYYY-MM-DD"
-        end_match = re.search(r'SET\s+@end_date\s*=\s*["\'](\d{4}-\d{2}-\d{2})["\']', query, re.IGNORECASE)
+        end_match = _END_RE.search(query)
         if end_match:
-            end_date = datetime.strptime(end_match.group(1), '%Y-%m-%d')
+            end_date = parse_date(end_match.group(1))
     
     return start_date, end_date
 
@@ -111,7 +278,384 @@ def generate_daily_ranges(start_date, end_date):
     return date_ranges
 
 
-def execute_query_to_csv(connection, query, output_file):
+class BackgroundFileWriter:
+    """
+    Write byte chunks to a file from a background thread, so encoding the next
+    batch overlaps with writing the previous one. At most queue_size chunks
+    are held in memory; write() blocks when the disk falls behind.
+    
+    Args:
+        output_file: Path to output file
+        queue_size: Maximum number of chunks waiting to be written
+    """
+    _EOF = object()
+    
+    def __init__(self, output_file, queue_size=WRITE_QUEUE_SIZE):
+        self._fh = open(output_file, 'wb', buffering=OUTPUT_BUFFER_SIZE)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+    
+    def _drain(self):
+        while True:
+            chunk = self._queue.get()
+            if chunk is self._EOF:
+                break
+            # After a failure keep draining so the producer never blocks on a full queue
+            if self._error is None:
+                try:
+                    self._fh.write(chunk)
+                except Exception as e:
+                    self._error = e
+    
+    def write(self, chunk):
+        if self._error is not None:
+            raise self._error
+        self._queue.put(chunk)
+    
+    def close(self):
+        self._queue.put(self._EOF)
+        self._thread.join()
+        try:
+            self._fh.close()
+        except Exception as e:
+            if self._error is None:
+                self._error = e
+        if self._error is not None:
+            raise self._error
+
+
+class CsvRowWriter:
+    """
+    Write a CSV file with the standard library csv module.
+    Also the base for the faster writers, which fall back to it for rows they can't encode.
+    Each call encodes its rows to one bytes chunk, written by a BackgroundFileWriter.
+    
+    Args:
+        output_file: Path to output CSV file
+    """
+    lineterminator = '\r\n'
+    
+    def __init__(self, output_file):
+        self._sink = BackgroundFileWriter(output_file)
+        # One StringIO reused for every batch: the csv writer's many small writes stay
+        # in memory and each batch reaches the sink as a single encoded chunk
+        self._buffer = io.StringIO()
+        self._csv_writer = csv.writer(self._buffer, lineterminator=self.lineterminator)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def write_header(self, column_names):
+        self._csv_writer.writerow(column_names)
+        self._flush_csv()
+    
+    def write_rows(self, rows):
+        self._csv_writer.writerows(rows)
+        self._flush_csv()
+    
+    def _flush_csv(self):
+        """Hand everything encoded by the csv writer so far to the sink."""
+        self._sink.write(self._buffer.getvalue().encode('utf-8'))
+        self._buffer.seek(0)
+        self._buffer.truncate()
+    
+    def close(self):
+        self._sink.close()
+
+
+class ArrowRowWriter(CsvRowWriter):
+    """
+    Write a CSV file with pyarrow's C++ CSV encoder, one record batch per write_rows() call.
+    The first batch picks the encoder for the whole file, so the formatting never
+    changes part-way through: if Arrow can't encode it faithfully (TIME, SET,
+    unsigned BIGINT beyond int64, mixed types), the csv module is used throughout.
+    """
+    lineterminator = '\n'
+    
+    def __init__(self, output_file):
+        super().__init__(output_file)
+        self._types = None  # Arrow type of each column, from the first batch
+        self._use_csv = False
+    
+    def write_header(self, column_names):
+        self._column_names = list(column_names)
+        super().write_header(column_names)
+    
+    def write_rows(self, rows):
+        if not rows:
+            return
+        if self._use_csv:
+            super().write_rows(rows)
+            return
+        
+        columns = list(zip(*rows))
+        if self._types is None:
+            try:
+                arrays = [self._widen(pa.array(column)) for column in columns]
+                encoded = None if any(self._unsupported(array.type) for array in arrays) else self._encode(arrays)
+            except (pa.ArrowException, OverflowError):
+                encoded = None
+            if encoded is None:
+                self._use_csv = True
+                super().write_rows(rows)
+                return
+            self._types = [array.type for array in arrays]
+        else:
+            arrays = [self._column_array(idx, column) for idx, column in enumerate(columns)]
+            try:
+                encoded = self._encode(arrays)
+            except (pa.ArrowException, OverflowError):
+                encoded = self._encode([self._text_array(column) for column in columns])
+        self._sink.write(encoded)
+    
+    @staticmethod
+    def _unsupported(arrow_type):
+        """Types whose Arrow CSV form differs from the value (TIME as microseconds) or can't be written."""
+        return pa.types.is_duration(arrow_type) or pa.types.is_nested(arrow_type)
+    
+    @staticmethod
+    def _widen(array):
+        """
+        Widen an inferred DECIMAL type to the largest precision with the same scale:
+        the first batch's values say nothing about how wide later ones get.
+        """
+        arrow_type = array.type
+        if pa.types.is_decimal128(arrow_type):
+            return array.cast(pa.decimal128(38, arrow_type.scale))
+        if pa.types.is_decimal256(arrow_type):
+            return array.cast(pa.decimal256(76, arrow_type.scale))
+        return array
+    
+    @staticmethod
+    def _text_array(column):
+        return pa.array([None if value is None else str(value) for value in column], type=pa.string())
+    
+    def _column_array(self, idx, column):
+        """Convert a column of a later batch, keeping the type chosen from the first batch."""
+        arrow_type = self._types[idx]
+        try:
+            if not pa.types.is_null(arrow_type):
+                return pa.array(column, type=arrow_type)
+            # All NULL so far: the first batch with values fixes the type
+            array = self._widen(pa.array(column))
+            if not self._unsupported(array.type):
+                self._types[idx] = array.type
+                return array
+        except (pa.ArrowException, OverflowError):
+            pass
+        # Values the first batch didn't predict (out-of-range integers, another type): as text
+        return self._text_array(column)
+    
+    def _encode(self, arrays):
+        batch = pa.RecordBatch.from_arrays(arrays, names=self._column_names)
+        encoded = pa.BufferOutputStream()
+        pa_csv.write_csv(batch, encoded, pa_csv.WriteOptions(include_header=False))
+        return encoded.getvalue()
+
+
+class NumpyRowWriter(CsvRowWriter):
+    """
+    Write a CSV file with numpy.savetxt for purely numeric results.
+    The first batch picks the encoder and each column's number format (%d for
+    integers, %.17g for floats) for the whole file, so the formatting never
+    changes part-way through: results that aren't numeric are written with the
+    csv module throughout, and batches numpy can't hold in one array (NULLs,
+    integers beyond int64) go through the csv module with the same number formats.
+    """
+    lineterminator = '\n'
+    
+    def __init__(self, output_file):
+        super().__init__(output_file)
+        self._formats = None  # Number format of each column; None while a column has only been NULL
+        self._use_csv = False
+    
+    def write_rows(self, rows):
+        if not rows:
+            return
+        if self._use_csv:
+            super().write_rows(rows)
+            return
+        
+        columns = list(zip(*rows))
+        if self._formats is None:
+            formats = [self._column_format(column) for column in columns]
+            if False in formats:
+                self._use_csv = True
+                super().write_rows(rows)
+                return
+            self._formats = formats
+        else:
+            self._formats = [fmt or self._column_format(column) or None
+                             for fmt, column in zip(self._formats, columns)]
+        
+        encoded = self._encode(rows, columns)
+        if encoded is None:
+            super().write_rows([tuple(self._format_value(fmt, value) for fmt, value in zip(self._formats, row))
+                                for row in rows])
+            return
+        self._sink.write(encoded)
+    
+    @staticmethod
+    def _column_format(column):
+        """Number format for a column: '%d', '%.17g', None if all NULL, False if not numeric."""
+        values = [value for value in column if value is not None]
+        if not values:
+            return None
+        if all(isinstance(value, int) for value in values):
+            return '%d'
+        if all(isinstance(value, (int, float)) for value in values):
+            return '%.17g'
+        return False
+    
+    @staticmethod
+    def _format_value(fmt, value):
+        if fmt is None or not isinstance(value, (int, float)):
+            return value
+        return fmt % value
+    
+    def _encode(self, rows, columns):
+        """Encode a batch with numpy.savetxt, or return None if it doesn't fit one numeric array."""
+        if None in self._formats:
+            return None
+        for fmt, column in zip(self._formats, columns):
+            kinds = int if fmt == '%d' else (int, float)
+            if not all(isinstance(value, kinds) for value in column):
+                return None
+        
+        if '%.17g' in self._formats:
+            # Integer columns share the float64 array, which holds them exactly only up to 2^53
+            if any(isinstance(value, int) and not -_FLOAT64_EXACT_INT <= value <= _FLOAT64_EXACT_INT
+                   for column in columns for value in column):
+                return None
+            dtype = np.float64
+        else:
+            dtype = np.int64
+        try:
+            matrix = np.asarray(rows, dtype=dtype)
+        except OverflowError:
+            # Unsigned BIGINT values beyond int64
+            return None
+        encoded = io.BytesIO()
+        np.savetxt(encoded, matrix, fmt=self._formats, delimiter=',')
+        return encoded.getvalue()
+
+
+class RawRowWriter(CsvRowWriter):
+    """
+    Write a CSV file from raw cursor rows (tuples of bytes) by joining the
+    values directly, without converting them to Python objects. Only valid
+    for results where every column is in _RAW_SAFE_TYPES.
+    """
+    lineterminator = '\n'
+    
+    def write_rows(self, rows):
+        self._sink.write(b''.join(
+            b','.join([b'' if value is None else value for value in row]) + b'\n'
+            for row in rows
+        ))
+
+
+def is_raw_safe(description):
+    """
+    Check whether a result can be written with RawRowWriter.
+    
+    Args:
+        description: cursor.description of the result
+        
+    Returns:
+        bool: True if every column is numeric or temporal
+    """
+    return all(desc[1] in _RAW_SAFE_TYPES for desc in description)
+
+
+def decode_raw_row(row):
+    """
+    Decode a raw cursor row (tuple of bytes) into strings for the regular writers.
+    
+    Args:
+        row: Tuple of bytes/bytearray values, None for NULL
+        
+    Returns:
+        tuple of str values, None for NULL
+    """
+    return tuple(None if value is None else bytes(value).decode('utf-8', 'backslashreplace') for value in row)
+
+
+ROW_WRITERS = {
+    'csv': CsvRowWriter,
+    'arrow': ArrowRowWriter,
+    'numpy': NumpyRowWriter,
+}
+
+
+def stream_rows_to_csv(cursor, row_writer, convert=None):
+    """
+    Stream the remaining rows of an executed cursor into a CSV row writer.
+    Rows are fetched in batches so memory stays bounded by the batch size.
+    
+    Args:
+        cursor: MySQL cursor with a pending result set
+        row_writer: Row writer (see ROW_WRITERS) to receive the rows
+        convert: Optional function applied to each row before writing
+        
+    Returns:
+        int: Number of rows written
+    """
+    row_count = 0
+    while True:
+        rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+        if not rows:
+            break
+        if convert is not None:
+            rows = [convert(row) for row in rows]
+        row_writer.write_rows(rows)
+        row_count += len(rows)
+    
+    return row_count
+
+
+def write_result_to_csv(cursor, output_file, writer=DEFAULT_WRITER, raw=False):
+    """
+    Stream the pending result set of a cursor to a CSV file.
+    
+    Args:
+        cursor: MySQL cursor with a pending result set
+        output_file: Path to output CSV file
+        writer: CSV writer name, one of ROW_WRITERS
+        raw: The cursor returns raw bytes (cursor(raw=True)); results with text
+             columns are then written with CsvRowWriter whatever the writer
+        
+    Returns:
+        int: Number of rows written
+    """
+    column_names = [desc[0] for desc in cursor.description]
+    
+    # Raw rows go straight to disk when no column needs quoting. Otherwise every
+    # column is decoded to text, which only the csv module writes like the typed
+    # values (Arrow would quote the numbers too)
+    row_writer_class = ROW_WRITERS[writer]
+    convert = None
+    if raw:
+        if is_raw_safe(cursor.description):
+            row_writer_class = RawRowWriter
+        else:
+            row_writer_class = CsvRowWriter
+            convert = decode_raw_row
+    
+    # Stream results to CSV
+    with row_writer_class(output_file) as row_writer:
+        row_writer.write_header(column_names)  # Write header
+        row_count = stream_rows_to_csv(cursor, row_writer, convert)  # Write data
+    
+    return row_count
+
+
+def execute_query_to_csv(connection, query, output_file, writer=DEFAULT_WRITER, raw=False):
     """
     Execute a SQL query and save results to CSV file.
     
@@ -119,9 +663,12 @@ def execute_query_to_csv(connection, query, output_file):
         connection: MySQL connection object
         query: SQL query string
         output_file: Path to output CSV file
+        writer: CSV writer name, one of ROW_WRITERS
+        raw: Fetch raw bytes and, for purely numeric/temporal results, write them
+             without per-value type conversion
     """
     try:
-        cursor = connection.cursor()
+        cursor = connection.cursor(buffered=False, raw=raw)
         cursor.execute(query)
         
         # Check if the query returns results (cursor.description is None for non-SELECT queries)
@@ -131,17 +678,7 @@ def execute_query_to_csv(connection, query, output_file):
             print(f"✓ Query executed successfully (no results to write)")
             return True
         
-        # Fetch all results
-        results = cursor.fetchall()
-        column_names = [desc[0] for desc in cursor.description]
-        
-        # Write to CSV
-        with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-            csv_writer = csv.writer(csvfile)
-            csv_writer.writerow(column_names)  # Write header
-            csv_writer.writerows(results)  # Write data
-        
-        row_count = len(results)
+        row_count = write_result_to_csv(cursor, output_file, writer, raw)
         print(f"✓ Query executed successfully: {row_count} rows written to {output_file}")
         
         cursor.close()
@@ -153,21 +690,413 @@ def execute_query_to_csv(connection, query, output_file):
         return False
 
 
-def execute_query_daily_to_csv(connection, queries, output_file):
+def execute_queries_to_csv(connection, queries, output_files, writer=DEFAULT_WRITER, raw=False):
     """
-    Execute queries day by day and combine results into a single CSV file.
+    Execute several SQL queries in a single multi-statement round-trip and
+    save each result to its own CSV file. The connection must be opened with
+    multi_statements=True. Execution stops at the first failing query.
+    Files with a CALL run their queries one at a time instead, since a stored
+    procedure can return several result sets for one statement.
     
     Args:
         connection: MySQL connection object
         queries: List of SQL query strings
+        output_files: Output CSV path for each query
+        writer: CSV writer name, one of ROW_WRITERS
+        raw: Fetch raw bytes (see execute_query_to_csv)
+        
+    Returns:
+        int: Number of queries executed successfully
+    """
+    success_count = 0
+    if not queries:
+        return success_count
+    
+    if any(statement_keyword(query) == 'CALL' for query in queries):
+        print("  File contains CALL: executing its queries one at a time")
+        for idx, (query, output_file) in enumerate(zip(queries, output_files), 1):
+            print(f"[{idx}/{len(queries)}] Executing query...")
+            if not execute_query_to_csv(connection, query, output_file, writer, raw):
+                print()
+                break
+            success_count += 1
+            print()
+        return success_count
+    
+    try:
+        cursor = connection.cursor(buffered=False, raw=raw)
+        results = cursor.execute(';\n'.join(queries), multi=True)
+        
+        for idx, result in enumerate(results, 1):
+            if idx > len(queries):
+                # Results no longer line up with the queries, so no output file can be trusted
+                print(f"✗ Error: more result sets than queries; output files may not match their queries")
+                print()
+                success_count = 0
+                break
+            output_file = output_files[idx - 1]
+            print(f"[{idx}/{len(queries)}] Executing query...")
+            if not result.with_rows:
+                # Query doesn't return results (e.g., SET, UPDATE, INSERT, DELETE)
+                print(f"✓ Query executed successfully (no results to write)")
+            else:
+                row_count = write_result_to_csv(result, output_file, writer, raw)
+                print(f"✓ Query executed successfully: {row_count} rows written to {output_file}")
+            success_count += 1
+            print()
+        
+        cursor.close()
+        
+    except mysql.connector.Error as err:
+        print(f"✗ Error executing query: {err}")
+        print(f"  Query: {queries[success_count][:100]}...")
+        print()
+    
+    return success_count
+
+
+def generate_batches(date_ranges, batch_days):
+    """
+    Group consecutive daily date ranges into batches.
+    
+    Args:
+        date_ranges: List of (day_start, day_end) tuples
+        batch_days: Maximum number of days per batch
+        
+    Returns:
+        List of lists of (day_start, day_end) tuples
+    """
+    return [date_ranges[i:i + batch_days] for i in range(0, len(date_ranges), batch_days)]
+
+
+def progress_checkpoints(total_days, batch_days):
+    """
+    Get the batches after which day-by-day progress is reported: the ones that
+    reach each multiple of 10 days, plus the last one.
+    
+    Args:
+        total_days: Number of days processed
+        batch_days: Number of days per batch (see generate_batches)
+        
+    Returns:
+        set of 1-based batch numbers
+    """
+    # -(-a // b) is ceil(a / b): the batch holding day number a
+    return {-(-day // batch_days) for day in range(10, total_days + 1, 10)} | {-(-total_days // batch_days)}
+
+
+def parameterize_dates(query):
+    """
+    Replace @start_date/@end_date references in a query with %s placeholders.
+    Only variable tokens are replaced, not text inside string literals or comments,
+    and not the variables a SET assigns. Literal % signs are doubled, since
+    parameters are interpolated pyformat-style.
+    
+    Args:
+        query: SQL query string
+        
+    Returns:
+        tuple: (sql, keys) where keys lists 'start' or 'end' for each placeholder, in order
+    """
+    tokens = list(sqlparse.parse(query)[0].flatten())
+    targets = _assignment_targets(tokens)
+    keys = []
+    parts = []
+    for idx, token in enumerate(tokens):
+        match = _DATE_VAR_RE.fullmatch(token.value) if token.ttype is sqlparse.tokens.Name else None
+        if match and idx not in targets:
+            keys.append(match.group(1).lower())
+            parts.append('%s')
+        else:
+            parts.append(token.value.replace('%', '%%'))
+    
+    return ''.join(parts), tuple(keys)
+
+
+def _significant_tokens(tokens):
+    """Indices of the tokens that aren't whitespace or comments."""
+    return [idx for idx, token in enumerate(tokens)
+            if not token.is_whitespace and token.ttype not in sqlparse.tokens.Comment]
+
+
+def _leading_keyword(tokens):
+    """First keyword of a statement, uppercased, after any leading comments ('' if none)."""
+    significant = _significant_tokens(tokens)
+    if not significant or tokens[significant[0]].ttype not in sqlparse.tokens.Keyword:
+        return ''
+    return tokens[significant[0]].value.upper()
+
+
+def _assignment_targets(tokens):
+    """
+    Find the user variables a statement assigns: the targets of SET @a = ..., @b = ...,
+    of SELECT ... INTO @a, @b and of @a := ... anywhere. sqlparse reads @name as one
+    Name token, except one-letter names, which come as '@' followed by a Name.
+    
+    Args:
+        tokens: Flattened sqlparse tokens of one statement
+        
+    Returns:
+        dict mapping the index of each target's Name token to the lowercased variable name
+    """
+    significant = _significant_tokens(tokens)
+    is_set = _leading_keyword(tokens) == 'SET'
+    
+    targets = {}
+    depth = 0
+    into_list = False  # Inside the variable list of an INTO clause
+    for pos, idx in enumerate(significant):
+        token = tokens[idx]
+        if token.match(sqlparse.tokens.Punctuation, '('):
+            depth += 1
+        elif token.match(sqlparse.tokens.Punctuation, ')'):
+            depth -= 1
+        if token.match(sqlparse.tokens.Keyword, 'INTO'):
+            into_list = True
+            continue
+        if token.ttype is not sqlparse.tokens.Name:
+            if not (token.match(sqlparse.tokens.Punctuation, ',') or token.match(sqlparse.tokens.Operator, '@')):
+                into_list = False
+            continue
+        
+        # Where the variable starts: its own token, or a preceding '@' for one-letter names
+        start = pos
+        if not token.value.startswith('@'):
+            if pos == 0 or not tokens[significant[pos - 1]].match(sqlparse.tokens.Operator, '@'):
+                into_list = False
+                continue
+            start = pos - 1
+        elif token.value.startswith('@@'):
+            continue  # System variable
+        name = token.value.lstrip('@').lower()
+        
+        before = tokens[significant[start - 1]] if start > 0 else None
+        after = tokens[significant[pos + 1]] if pos + 1 < len(significant) else None
+        if into_list:
+            targets[idx] = name
+        elif after is None:
+            continue
+        elif after.ttype is sqlparse.tokens.Assignment:
+            targets[idx] = name
+        elif (is_set and depth == 0 and after.value == '=' and before is not None
+              and (before.match(sqlparse.tokens.Keyword, 'SET') or before.match(sqlparse.tokens.Punctuation, ','))):
+            targets[idx] = name
+    
+    return targets
+
+
+def statement_keyword(query):
+    """
+    Get the keyword a statement starts with, skipping leading comments.
+    
+    Args:
+        query: SQL query string
+        
+    Returns:
+        Uppercased keyword (e.g. 'SELECT', 'SET'), or '' if the statement doesn't start with one
+    """
+    return _leading_keyword(list(sqlparse.parse(query)[0].flatten()))
+
+
+def is_plain_select(query):
+    """
+    Check whether a statement only reads: a SELECT that assigns no variables and
+    has no INTO clause, so running it for several days in any order is safe.
+    
+    Args:
+        query: SQL query string
+        
+    Returns:
+        bool: True for a plain SELECT
+    """
+    tokens = list(sqlparse.parse(query)[0].flatten())
+    return (_leading_keyword(tokens) == 'SELECT' and not _assignment_targets(tokens)
+            and not any(token.match(sqlparse.tokens.Keyword, 'INTO') for token in tokens))
+
+
+def has_top_level_order_by(query):
+    """
+    Check whether a statement sorts its own result. MySQL ignores ORDER BY inside
+    a parenthesised UNION member without LIMIT, so such SELECTs can't be batched.
+    
+    Args:
+        query: SQL query string
+        
+    Returns:
+        bool: True if the statement has an ORDER BY outside parentheses
+    """
+    depth = 0
+    for token in sqlparse.parse(query)[0].flatten():
+        if token.match(sqlparse.tokens.Punctuation, '('):
+            depth += 1
+        elif token.match(sqlparse.tokens.Punctuation, ')'):
+            depth -= 1
+        elif depth == 0 and token.ttype in sqlparse.tokens.Keyword and ' '.join(token.value.upper().split()) == 'ORDER BY':
+            return True
+    return False
+
+
+def assigned_variables(query):
+    """
+    Get the user variables a statement assigns (see _assignment_targets).
+    
+    Args:
+        query: SQL query string
+        
+    Returns:
+        set of lowercased variable names, without the @
+    """
+    return set(_assignment_targets(list(sqlparse.parse(query)[0].flatten())).values())
+
+
+def bind_dates(keys, day_start, day_end):
+    """
+    Build the parameter tuple for a statement returned by parameterize_dates.
+    
+    Args:
+        keys: Placeholder keys from parameterize_dates
+        day_start: datetime object for the start date
+        day_end: datetime object for the end date
+        
+    Returns:
+        tuple of date objects, one per placeholder
+    """
+    values = {'start': day_start.date(), 'end': day_end.date()}
+    return tuple(values[key] for key in keys)
+
+
+def batch_statements(plan, days):
+    """
+    Build the statements run for a batch of consecutive days, after plan.prelude_sets.
+    When every statement is a plain SELECT, each one goes to the server once per
+    batch: as a single UNION ALL of per-day SELECTs, or day by day if it has its
+    own ORDER BY. Any other statement (SET, CREATE/DROP/INSERT, SELECT ... INTO)
+    changes session or table state, so such a plan (plan.per_day) runs all its
+    statements day by day in file order instead.
+    
+    Args:
+        plan: _QueryPlan from build_query_plan
+        days: List of (day_start, day_end) tuples, in date order
+        
+    Returns:
+        List of (sql, params) tuples, in execution order
+    """
+    if plan.per_day:
+        return [(sql, bind_dates(keys, day_start, day_end))
+                for day_start, day_end in days
+                for sql, keys in plan.day_statements]
+    
+    statements = []
+    for (sql, keys), unionable in zip(plan.day_statements, plan.unionable):
+        if len(days) > 1 and unionable:
+            # One statement for the whole batch: (SELECT day 1) UNION ALL (SELECT day 2) ...
+            union_sql = ' UNION ALL '.join([f'({sql})'] * len(days))
+            params = tuple(param for day_start, day_end in days
+                           for param in bind_dates(keys, day_start, day_end))
+            statements.append((union_sql, params))
+        else:
+            statements.extend((sql, bind_dates(keys, day_start, day_end)) for day_start, day_end in days)
+    
+    return statements
+
+
+async def _run_one_batch(pool, plan, ready_connections, days):
+    """
+    Run the statements for a batch of consecutive days (see batch_statements)
+    on a pooled connection, with the batch's dates bound as query parameters.
+    
+    Args:
+        pool: aiomysql connection pool
+        plan: _QueryPlan from build_query_plan
+        ready_connections: Set of connections that already ran plan.prelude_sets
+        days: List of (day_start, day_end) tuples, in date order
+        
+    Returns:
+        tuple: (column_names, rows) where column_names is None if nothing was selected
+    """
+    column_names = None
+    rows = []
+    
+    async with pool.acquire() as connection:
+        async with connection.cursor() as cursor:
+            # Leading constant SETs run once per connection (pooled sessions keep their variables)
+            if connection not in ready_connections:
+                for query in plan.prelude_sets:
+                    await cursor.execute(query)
+                ready_connections.add(connection)
+            
+            for statement, params in batch_statements(plan, days):
+                await cursor.execute(statement, params)
+                
+                if cursor.description:
+                    if column_names is None:
+                        column_names = [desc[0] for desc in cursor.description]
+                    rows.extend(await cursor.fetchall())
+    
+    return column_names, rows
+
+
+def build_query_plan(queries):
+    """
+    Analyse a parsed SQL file once: extract the date range and classify the
+    statements for day-by-day processing.
+    
+    Args:
+        queries: List of SQL query strings
+        
+    Returns:
+        _QueryPlan for the queries (start_date/end_date are None without a date range)
+    """
+    start_date, end_date = extract_date_range(queries)
+    assigned = [assigned_variables(query) for query in queries]
+    
+    prelude_sets = []    # Leading constant SETs: once per connection
+    day_statements = []  # Everything from the first other statement on, in file order: bound per day
+    day_queries = []     # The unparameterized text of each day statement
+    for idx, query in enumerate(queries):
+        sql, keys = parameterize_dates(query)
+        is_set = statement_keyword(query) == 'SET'
+        if is_set and not keys and assigned[idx] and assigned[idx] <= _DATE_VARIABLES:
+            # The date SETs themselves are dropped: their values are bound as
+            # parameters wherever the variables are used
+            continue
+        later_assigned = set().union(*assigned[idx + 1:])
+        if not day_statements and is_set and not keys and not assigned[idx] & later_assigned:
+            # No date references and nothing later reassigns its variables, so the values
+            # it leaves in the session are the same for every day
+            prelude_sets.append(query)
+        else:
+            day_statements.append((sql, keys))
+            day_queries.append(query)
+    
+    # Statements other than plain SELECTs change state, so days can't share a UNION ALL
+    per_day = not all(is_plain_select(query) for query in day_queries)
+    unionable = [not has_top_level_order_by(query) for query in day_queries]
+    
+    return _QueryPlan(queries, prelude_sets, day_statements, per_day, unionable, start_date, end_date)
+
+
+async def execute_query_daily_to_csv(db_config, plan, output_file, max_workers=DEFAULT_MAX_WORKERS,
+                                     batch_days=DEFAULT_BATCH_DAYS, writer=DEFAULT_WRITER):
+    """
+    Execute queries day by day and combine results into a single CSV file.
+    Days are grouped into batches that run as concurrent asyncio tasks on
+    pooled connections and are written to the CSV in date order.
+    
+    Args:
+        db_config: Connection arguments for create_connection_pool
+        plan: _QueryPlan from build_query_plan
         output_file: Path to output CSV file
+        max_workers: Number of batches queried concurrently (the pool size); together with
+                     batch_days this bounds how many days of rows are held in memory
+        batch_days: Number of consecutive days sent to the server in one query
+        writer: CSV writer name, one of ROW_WRITERS
         
     Returns:
         bool: True if successful, False otherwise
     """
     try:
-        # Extract date range
-        start_date, end_date = extract_date_range(queries)
+        start_date, end_date = plan.start_date, plan.end_date
         
         if not start_date or not end_date:
             print("✗ Could not extract date range from queries")
@@ -176,68 +1105,80 @@ def execute_query_daily_to_csv(connection, queries, output_file):
         # Generate daily ranges
         date_ranges = generate_daily_ranges(start_date, end_date)
         total_days = len(date_ranges)
+        batches = generate_batches(date_ranges, batch_days)
         
-        print(f"  Date range: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
-        print(f"  Processing {total_days} days...")
+        pool = await create_connection_pool(pool_size=max_workers, **db_config)
+        ready_connections = set()
+        loop = asyncio.get_running_loop()
+        
+        print(f"  Date range: {format_date(start_date)} to {format_date(end_date)}")
+        print(f"  Processing {total_days} days in {len(batches)} batches with {max_workers} workers...")
+        
+        checkpoints = progress_checkpoints(total_days, batch_days)
         
-        cursor = connection.cursor()
-        all_results = []
         column_names = None
+        total_rows = 0
+        days_done = 0
+        batches_done = 0
         
-        # Process each day
-        for idx, (day_start, day_end) in enumerate(date_ranges, 1):
-            # Execute SET statements with daily dates
-            for query in queries:
-                if query.strip().upper().startswith('SET'):
-                    # Replace date values with current day
-                    modified_query = query
-                    if '@start_date' in query.lower():
-                        modified_query = re.sub(
-                            r'(SET\s+@start_date\s*=\s*)["\'][\d-]+["\']',
-                            f'\\1"{day_start.strftime("%Y-%m-%d")}"',
-                            modified_query,
-                            flags=re.IGNORECASE
-                        )
-                    if '@end_date' in query.lower():
-                        modified_query = re.sub(
-                            r'(SET\s+@end_date\s*=\s*)["\'][\d-]+["\']',
-                            f'\\1"{day_end.strftime("%Y-%m-%d")}"',
-                            modified_query,
-                            flags=re.IGNORECASE
-                        )
-                    cursor.execute(modified_query)
-                else:
-                    # Execute SELECT query
-                    cursor.execute(query)
-                    
-                    # Get column names from first execution
-                    if column_names is None and cursor.description:
-                        column_names = [desc[0] for desc in cursor.description]
-                    
-                    # Fetch results if any
-                    if cursor.description:
-                        results = cursor.fetchall()
-                        all_results.extend(results)
-            
-            # Progress indicator
-            if idx % 10 == 0 or idx == total_days:
-                print(f"  Progress: {idx}/{total_days} days processed ({len(all_results)} rows so far)")
+        try:
+            # Write each day's rows as soon as they arrive
+            with ROW_WRITERS[writer](output_file) as row_writer:
+                # Only max_workers batches are in flight (one per pooled connection), so finished
+                # batches waiting behind a slow one can't pile up in memory: at most
+                # max_workers * batch_days days of rows are held at once
+                remaining = iter(batches)
+                pending = deque(
+                    (days, asyncio.ensure_future(_run_one_batch(pool, plan, ready_connections, days)))
+                    for days in islice(remaining, max_workers)
+                )
+                
+                try:
+                    # Consume in submission order so the CSV stays sorted by date
+                    while pending:
+                        days, task = pending.popleft()
+                        batch_columns, rows = await task
+                        
+                        next_days = next(remaining, None)
+                        if next_days is not None:
+                            pending.append((next_days, asyncio.ensure_future(
+                                _run_one_batch(pool, plan, ready_connections, next_days))))
+                        
+                        # Write header from first batch that returned results
+                        if column_names is None and batch_columns:
+                            column_names = batch_columns
+                            row_writer.write_header(column_names)
+                        
+                        # Encode off the event loop so in-flight batches keep receiving rows
+                        await loop.run_in_executor(None, row_writer.write_rows, rows)
+                        total_rows += len(rows)
+                        
+                        # Progress indicator (every 10 days), on stderr so it doesn't mix with results output
+                        days_done += len(days)
+                        batches_done += 1
+                        if batches_done in checkpoints:
+                            print(f"  Progress: {days_done}/{total_days} days processed ({total_rows} rows so far)",
+                                  file=sys.stderr)
+                except BaseException:
+                    # Don't keep querying the remaining days after a failure
+                    for _, task in pending:
+                        task.cancel()
+                    await asyncio.gather(*(task for _, task in pending), return_exceptions=True)
+                    raise
+        finally:
+            pool.close()
+            await pool.wait_closed()
         
-        # Write all results to CSV
         if column_names:
-            with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-                csv_writer = csv.writer(csvfile)
-                csv_writer.writerow(column_names)  # Write header
-                csv_writer.writerows(all_results)  # Write all data
-            
-            print(f"✓ Query executed successfully: {len(all_results)} total rows written to {output_file}")
+            print(f"✓ Query executed successfully: {total_rows} total rows written to {output_file}")
         else:
+            # Nothing was returned, so don't leave an empty file behind
+            os.remove(output_file)
             print(f"✓ Query executed successfully (no results to write)")
         
-        cursor.close()
         return True
         
-    except mysql.connector.Error as err:
+    except aiomysql.Error as err:
         print(f"✗ Error executing query: {err}")
         return False
     except Exception as e:
@@ -261,10 +1202,12 @@ def find_sql_files(directory='.'):
 
 def append_run_log(log_file, run_date, start_date, end_date, total_sec, status, sql_query):
     """
-    Append a row to the run log CSV file.
+    Append a record to the run log JSONL file (one JSON object per line).
+    The SQL content is stored LZ4-compressed and base64-encoded; use
+    decode_logged_sql to read it back.
 
     Args:
-        log_file: Path to the log CSV file
+        log_file: Path to the log JSONL file
         run_date: Date of the run (YYYY-MM-DD)
         start_date: Run start datetime string
         end_date: Run end datetime string
@@ -272,12 +1215,30 @@ def append_run_log(log_file, run_date, start_date, end_date, total_sec, status,
         status: success or failure
         sql_query: The SQL query/queries content
     """
-    file_exists = log_file.exists()
-    with open(log_file, 'a', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        if not file_exists:
-            writer.writerow(['date', 'start date', 'end date', 'total time(sec)', 'status', 'sql query'])
-        writer.writerow([run_date, start_date, end_date, total_sec, status, sql_query])
+    record = {
+        'date': run_date,
+        'start_date': start_date,
+        'end_date': end_date,
+        'total_sec': total_sec,
+        'status': status,
+        'sql_query_encoding': 'lz4+base64',
+        'sql_query': base64.b64encode(lz4.frame.compress(sql_query.encode('utf-8'))).decode('ascii'),
+    }
+    with open(log_file, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record) + '\n')
+
+
+def decode_logged_sql(record):
+    """
+    Recover the SQL content from a run log record written by append_run_log.
+
+    Args:
+        record: Parsed JSON object from one line of the run log
+
+    Returns:
+        The SQL query/queries content
+    """
+    return lz4.frame.decompress(base64.b64decode(record['sql_query'])).decode('utf-8')
 
 
 def main():
@@ -298,18 +1259,55 @@ Environment Variables (required):
 Examples:
   python query_runner.py                    # Finds and runs first .sql file in current directory
   python query_runner.py -f queries.sql     # Runs specific SQL file
+  python query_runner.py --all              # Runs every .sql file in current directory
   python query_runner.py -o results/        # Custom output directory
+  python query_runner.py --max-workers 4    # Query 4 batches at a time in day-by-day mode
+  python query_runner.py --batch-days 1     # One query per day in day-by-day mode
+  python query_runner.py --writer csv       # Use the standard library csv writer
+  python query_runner.py --raw              # Skip type conversion for numeric results
         """
     )
     
     parser.add_argument('-f', '--file', help='Path to SQL file (optional, auto-detects if not provided)')
+    parser.add_argument('--all', action='store_true',
+                        help='Run every SQL file in the current directory over one connection')
     parser.add_argument('-o', '--output-dir', default='output', help='Output directory for CSV files (default: output)')
+    parser.add_argument('--max-workers', type=int, default=DEFAULT_MAX_WORKERS,
+                        help=f'Batches queried concurrently in day-by-day mode (default: {DEFAULT_MAX_WORKERS})')
+    parser.add_argument('--batch-days', type=int, default=DEFAULT_BATCH_DAYS,
+                        help=f'Days combined into one UNION ALL query in day-by-day mode (default: {DEFAULT_BATCH_DAYS})')
+    parser.add_argument('--writer', choices=sorted(ROW_WRITERS), default=DEFAULT_WRITER,
+                        help=f'CSV writer implementation (default: {DEFAULT_WRITER})')
+    parser.add_argument('--raw', action='store_true',
+                        help='Fetch raw values and write numeric/temporal results without type conversion '
+                             '(normal mode only)')
     
     args = parser.parse_args()
     
-    # Determine which SQL file to use
-    if args.file:
-        sql_file = args.file
+    if args.max_workers < 1:
+        print("✗ Error: --max-workers must be at least 1")
+        sys.exit(1)
+    if args.batch_days < 1:
+        print("✗ Error: --batch-days must be at least 1")
+        sys.exit(1)
+    if args.writer == 'arrow' and pa is None:
+        print("✗ Error: --writer arrow requires pyarrow (pip install pyarrow)")
+        sys.exit(1)
+    if args.writer == 'numpy' and np is None:
+        print("✗ Error: --writer numpy requires numpy (pip install numpy)")
+        sys.exit(1)
+    
+    # Determine which SQL file(s) to use
+    if args.all:
+        if args.file:
+            print("✗ Error: --all and -f cannot be used together")
+            sys.exit(1)
+        sql_files = [str(f) for f in find_sql_files()]
+        if not sql_files:
+            print("✗ Error: No SQL files found in current directory")
+            sys.exit(1)
+    elif args.file:
+        sql_files = [args.file]
     else:
         # Auto-detect SQL files in current directory
         sql_files = find_sql_files()
@@ -322,8 +1320,8 @@ Examples:
             for idx, f in enumerate(sql_files, 1):
                 print(f"  {idx}. {f.name}")
             print(f"\nUsing: {sql_files[0].name}")
-            print("  (Use -f option to specify a different file)\n")
-        sql_file = str(sql_files[0])
+            print("  (Use -f option to specify a different file, or --all to run every file)\n")
+        sql_files = [str(sql_files[0])]
     
     # Get database credentials from environment variables
     db_host = os.getenv('DB_HOST', 'localhost')
@@ -343,10 +1341,11 @@ Examples:
         print("✗ Error: DB_NAME environment variable is required")
         sys.exit(1)
     
-    # Validate SQL file exists
-    if not os.path.isfile(sql_file):
-        print(f"✗ Error: SQL file not found: {sql_file}")
-        sys.exit(1)
+    # Validate SQL files exist
+    for sql_file in sql_files:
+        if not os.path.isfile(sql_file):
+            print(f"✗ Error: SQL file not found: {sql_file}")
+            sys.exit(1)
     
     # Create output directory if it doesn't exist
     output_dir = Path(args.output_dir)
@@ -356,90 +1355,116 @@ Examples:
     print(f"Query Runner - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"{'='*60}\n")
     
-    # Parse SQL file
-    print(f"Reading SQL file: {sql_file}")
-    queries = parse_sql_file(sql_file)
-    print(f"✓ Found {len(queries)} query/queries\n")
-    
-    # Connect to database
-    connection = connect_to_database(
-        host=db_host,
-        user=db_user,
-        password=db_password,
-        database=db_name,
-        port=db_port
-    )
+    # Parse SQL files and check which contain a date range for daily processing
+    sql_runs = []
+    for sql_file in sql_files:
+        print(f"Reading SQL file: {sql_file}")
+        queries = parse_sql_file(sql_file)
+        print(f"✓ Found {len(queries)} query/queries\n")
+        if not queries and args.all:
+            # Empty or comment-only file: nothing to send
+            print(f"  Skipping {sql_file}\n")
+            continue
+        sql_runs.append((sql_file, build_query_plan(queries)))
+    
+    # Connect to database once for all files (day-by-day processing opens its own connection pool)
+    db_config = dict(host=db_host, user=db_user, password=db_password, database=db_name, port=db_port)
+    connection = None
+    if not all(plan.start_date and plan.end_date for _, plan in sql_runs):
+        connection = connect_to_database(multi_statements=args.all, **db_config)
     
     print(f"\nExecuting queries...\n")
 
-    start_time = datetime.now()
-    with open(sql_file, 'r', encoding='utf-8') as f:
-        sql_content = f.read()
+    # Write run log to separate logs folder
+    log_dir = Path("logs")
+    log_dir.mkdir(parents=True, exist_ok=True)
+    log_file = log_dir / "query_runner_log.jsonl"
+
+    summaries = []
+    for sql_file, plan in sql_runs:
+        queries = plan.queries
+        daily = bool(plan.start_date and plan.end_date)
+        start_time = datetime.now()
+        with open(sql_file, 'r', encoding='utf-8') as f:
+            sql_content = f.read()
 
-    # Check if queries contain date range for daily processing
-    start_date, end_date = extract_date_range(queries)
+        # One timestamp per run; output files from the same run differ by query number
+        timestamp = start_time.strftime('%Y%m%d_%H%M%S')
+        # With --all, prefix output files with the SQL file name so runs don't collide
+        prefix = f"{Path(sql_file).stem}_" if args.all else ""
 
-    # Execute queries
-    success_count = 0
-    status = "success"
+        # Execute queries
+        success_count = 0
+        status = "success"
 
-    if start_date and end_date:
-        # Use day-by-day processing for queries with date ranges
-        print(f"Detected date range in queries. Using day-by-day processing for optimal performance.\n")
-        
-        # Generate output filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        output_file = output_dir / f"combined_results_{timestamp}.csv"
-        
-        print(f"[1/1] Executing query with daily processing...")
-        if execute_query_daily_to_csv(connection, queries, output_file):
-            success_count += 1
-        else:
-            status = "failure"
-        print()
-    else:
-        # Execute each query normally
-        for idx, query in enumerate(queries, 1):
+        if args.all:
+            print(f"--- {sql_file} ---\n")
+
+        if daily:
+            # Use day-by-day processing for queries with date ranges
+            print(f"Detected date range in queries. Using day-by-day processing for optimal performance.\n")
+            
             # Generate output filename
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            output_file = output_dir / f"query_{idx}_{timestamp}.csv"
+            output_file = output_dir / f"{prefix}combined_results_{timestamp}.csv"
             
-            print(f"[{idx}/{len(queries)}] Executing query...")
-            if execute_query_to_csv(connection, query, output_file):
+            print(f"[1/1] Executing query with daily processing...")
+            if asyncio.run(execute_query_daily_to_csv(db_config, plan, output_file, max_workers=args.max_workers,
+                                                      batch_days=args.batch_days, writer=args.writer)):
                 success_count += 1
+            else:
+                status = "failure"
             print()
-        if success_count < len(queries):
-            status = "failure"
+        elif args.all:
+            # Send the whole file in one multi-statement round-trip
+            output_files = [output_dir / f"{prefix}query_{idx}_{timestamp}.csv" for idx in range(1, len(queries) + 1)]
+            success_count = execute_queries_to_csv(connection, queries, output_files, writer=args.writer, raw=args.raw)
+            if success_count < len(queries):
+                status = "failure"
+        else:
+            # Execute each query normally
+            for idx, query in enumerate(queries, 1):
+                # Generate output filename
+                output_file = output_dir / f"{prefix}query_{idx}_{timestamp}.csv"
+                
+                print(f"[{idx}/{len(queries)}] Executing query...")
+                if execute_query_to_csv(connection, query, output_file, writer=args.writer, raw=args.raw):
+                    success_count += 1
+                print()
+            if success_count < len(queries):
+                status = "failure"
 
-    # Close connection
-    connection.close()
+        end_time = datetime.now()
+        total_sec = (end_time - start_time).total_seconds()
+        append_run_log(
+            log_file,
+            run_date=start_time.strftime('%Y-%m-%d'),
+            start_date=start_time.strftime('%Y-%m-%d %H:%M:%S'),
+            end_date=end_time.strftime('%Y-%m-%d %H:%M:%S'),
+            total_sec=round(total_sec, 2),
+            status=status,
+            sql_query=sql_content
+        )
 
-    # Write run log to separate logs folder
-    log_dir = Path("logs")
-    log_dir.mkdir(parents=True, exist_ok=True)
-    end_time = datetime.now()
-    total_sec = (end_time - start_time).total_seconds()
-    log_file = log_dir / "query_runner_log.csv"
-    append_run_log(
-        log_file,
-        run_date=start_time.strftime('%Y-%m-%d'),
-        start_date=start_time.strftime('%Y-%m-%d %H:%M:%S'),
-        end_date=end_time.strftime('%Y-%m-%d %H:%M:%S'),
-        total_sec=round(total_sec, 2),
-        status=status,
-        sql_query=sql_content
-    )
+        if daily:
+            summaries.append(f"Query executed successfully with day-by-day processing")
+        else:
+            summaries.append(f"{success_count}/{len(queries)} queries executed successfully")
+
+    # Close connection
+    if connection is not None:
+        connection.close()
 
     # Summary
     print(f"{'='*60}")
-    if start_date and end_date:
-        print(f"Summary: Query executed successfully with day-by-day processing")
+    if args.all:
+        print(f"Summary:")
+        for (sql_file, _), summary in zip(sql_runs, summaries):
+            print(f"  {sql_file}: {summary}")
     else:
-        print(f"Summary: {success_count}/{len(queries)} queries executed successfully")
+        print(f"Summary: {summaries[0]}")
     print(f"Output directory: {output_dir.absolute()}")
     print(f"{'='*60}\n")
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,372 @@
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from mysql.connector.constants import FieldType
+
+import query_runner
+from query_runner import batch_statements, build_query_plan, generate_daily_ranges
+
+
+DATE_RANGE_SETS = [
+    "SET @start_date = '2024-01-01'",
+    "SET @end_date = '2024-01-03'",
+]
+
+
+def plan_days(plan):
+    return generate_daily_ranges(plan.start_date, plan.end_date)
+
+
+def test_batch_statements_union_per_batch():
+    plan = build_query_plan(DATE_RANGE_SETS + [
+        "SELECT * FROM t WHERE ts >= @start_date AND ts <= @end_date",
+    ])
+
+    assert batch_statements(plan, plan_days(plan)) == [(
+        '(SELECT * FROM t WHERE ts >= %s AND ts <= %s)'
+        ' UNION ALL (SELECT * FROM t WHERE ts >= %s AND ts <= %s)'
+        ' UNION ALL (SELECT * FROM t WHERE ts >= %s AND ts <= %s)',
+        (date(2024, 1, 1), date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 2),
+         date(2024, 1, 3), date(2024, 1, 3)),
+    )]
+
+
+def test_batch_statements_derived_date_set_runs_per_day():
+    plan = build_query_plan(DATE_RANGE_SETS + [
+        "SET @next = DATE_ADD(@end_date, INTERVAL 1 DAY)",
+        "SELECT * FROM t WHERE ts >= @start_date AND ts < @next",
+    ])
+
+    statements = batch_statements(plan, plan_days(plan))
+
+    expected = []
+    for day in (date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 3)):
+        expected += [
+            ('SET @next = DATE_ADD(%s, INTERVAL 1 DAY)', (day,)),
+            ('SELECT * FROM t WHERE ts >= %s AND ts < @next', (day,)),
+        ]
+    assert statements == expected
+
+
+def test_batch_statements_temporary_table_runs_per_day_in_order():
+    plan = build_query_plan(DATE_RANGE_SETS + [
+        "DROP TEMPORARY TABLE IF EXISTS tmp",
+        "CREATE TEMPORARY TABLE tmp AS SELECT * FROM t WHERE d = @start_date",
+        "SELECT * FROM tmp",
+    ])
+
+    expected = []
+    for day in (date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 3)):
+        expected += [
+            ('DROP TEMPORARY TABLE IF EXISTS tmp', ()),
+            ('CREATE TEMPORARY TABLE tmp AS SELECT * FROM t WHERE d = %s', (day,)),
+            ('SELECT * FROM tmp', ()),
+        ]
+    assert batch_statements(plan, plan_days(plan)) == expected
+
+
+def test_batch_statements_select_into_runs_per_day():
+    plan = build_query_plan(DATE_RANGE_SETS + [
+        "SELECT MAX(id) INTO @last FROM t WHERE d = @start_date",
+        "SELECT * FROM t WHERE id = @last",
+    ])
+
+    assert plan.per_day
+    assert [sql for sql, _ in batch_statements(plan, plan_days(plan))] == [
+        'SELECT MAX(id) INTO @last FROM t WHERE d = %s', 'SELECT * FROM t WHERE id = @last',
+    ] * 3
+
+
+def test_batch_statements_ordered_select_is_not_unioned():
+    plan = build_query_plan(DATE_RANGE_SETS + [
+        "SELECT * FROM t WHERE d = @start_date ORDER BY id",
+        "SELECT * FROM (SELECT * FROM t ORDER BY id LIMIT 5) s WHERE d = @end_date",
+    ])
+
+    assert not plan.per_day
+    assert batch_statements(plan, plan_days(plan)) == [
+        ('SELECT * FROM t WHERE d = %s ORDER BY id', (date(2024, 1, 1),)),
+        ('SELECT * FROM t WHERE d = %s ORDER BY id', (date(2024, 1, 2),)),
+        ('SELECT * FROM t WHERE d = %s ORDER BY id', (date(2024, 1, 3),)),
+        (' UNION ALL '.join(['(SELECT * FROM (SELECT * FROM t ORDER BY id LIMIT 5) s WHERE d = %s)'] * 3),
+         (date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 3))),
+    ]
+
+
+def write_csv(tmp_path, writer_class, column_names, batches):
+    output_file = tmp_path / 'out.csv'
+    with writer_class(output_file) as row_writer:
+        row_writer.write_header(column_names)
+        for rows in batches:
+            row_writer.write_rows(rows)
+    return output_file.read_text()
+
+
+@pytest.mark.parametrize('batches, expected', [
+    # TIME columns arrive as timedelta, which Arrow would write as microseconds
+    ([[(timedelta(hours=1),)], [(timedelta(hours=2),)]], 'a\n1:00:00\n2:00:00\n'),
+    # Unsigned BIGINT beyond int64
+    ([[(2 ** 63,)], [(1,)]], 'a\n9223372036854775808\n1\n'),
+    # SET columns arrive as Python sets
+    ([[({'x'},)]], "a\n{'x'}\n"),
+    # True/datetime render differently in Arrow and csv: the first batch decides for the file
+    ([[(True, timedelta(hours=1))], [(False, datetime(2024, 1, 2))]],
+     'a,b\nTrue,1:00:00\nFalse,2024-01-02 00:00:00\n'),
+    ([[(True, datetime(2024, 1, 1))], [(False, datetime(2024, 1, 2))]],
+     'a,b\ntrue,2024-01-01 00:00:00.000000\nfalse,2024-01-02 00:00:00.000000\n'),
+    # DECIMAL(10,2) whose first batch only holds small values
+    ([[(Decimal('1.50'),), (Decimal('2.25'),)], [(Decimal('12345.67'),)]], 'a\n1.50\n2.25\n12345.67\n'),
+])
+def test_arrow_writer_mysql_types(tmp_path, batches, expected):
+    pytest.importorskip('pyarrow')
+    column_names = ['a', 'b'][:len(batches[0][0])]
+
+    assert write_csv(tmp_path, query_runner.ArrowRowWriter, column_names, batches) == expected
+
+
+@pytest.mark.parametrize('batches, expected', [
+    ([[(9007199254740993, 0.1)]], 'a,b\n9007199254740993,0.10000000000000001\n'),
+    ([[(9007199254740992, 0.5)]], 'a,b\n9007199254740992,0.5\n'),
+    # A batch with a NULL keeps the first batch's number formats
+    ([[(1, 0.1)], [(2, None)], [(3, 0.1)]], 'a,b\n1,0.10000000000000001\n2,\n3,0.10000000000000001\n'),
+    ([[(1, None)], [(2, 0.1)]], 'a,b\n1,\n2,0.10000000000000001\n'),
+    ([[(2 ** 63, 1)], [(1, 2)]], 'a,b\n9223372036854775808,1\n1,2\n'),
+    # Non-numeric results use the csv module for the whole file
+    ([[('x', 0.1)], [(1, 0.1)]], 'a,b\nx,0.1\n1,0.1\n'),
+])
+def test_numpy_writer_formats(tmp_path, batches, expected):
+    pytest.importorskip('numpy')
+
+    assert write_csv(tmp_path, query_runner.NumpyRowWriter, ['a', 'b'], batches) == expected
+
+
+def test_parameterize_dates_skips_literals_and_comments():
+    sql, keys = query_runner.parameterize_dates(
+        "SELECT '@start_date' AS label, @START_DATE, `@end_date` -- @end_date\n"
+        "FROM t WHERE name LIKE 'a%' AND ts <= @end_date"
+    )
+
+    assert sql == ("SELECT '@start_date' AS label, %s, `@end_date` -- @end_date\n"
+                   "FROM t WHERE name LIKE 'a%%' AND ts <= %s")
+    assert keys == ('start', 'end')
+
+
+def test_parse_sql_file_strips_trailing_comments(tmp_path):
+    sql_file = tmp_path / 'queries.sql'
+    sql_file.write_text("SELECT a FROM t\n-- WHERE b = 1\n;\nSELECT 'x;y' /* c */ ; -- done\n-- only a comment\n")
+
+    assert query_runner.parse_sql_file(sql_file) == ['SELECT a FROM t', "SELECT 'x;y'"]
+
+
+def test_build_query_plan_keeps_derived_set_order():
+    plan = build_query_plan(DATE_RANGE_SETS + [
+        "SET @y = DATE_ADD(@start_date, INTERVAL 1 DAY)",
+        "SET @z = @y",
+        "SELECT * FROM t WHERE ts >= @z",
+    ])
+
+    assert plan.prelude_sets == []
+    assert plan.day_statements == [
+        ('SET @y = DATE_ADD(%s, INTERVAL 1 DAY)', ('start',)),
+        ('SET @z = @y', ()),
+        ('SELECT * FROM t WHERE ts >= @z', ()),
+    ]
+    assert plan.per_day
+
+
+def test_build_query_plan_keeps_assignments_next_to_date_set():
+    plan = build_query_plan([
+        "SET @start_date = '2024-01-01', @x = 5",
+        "SET @end_date = '2024-01-03'",
+        "SELECT * FROM t WHERE ts >= @start_date AND n = @x",
+    ])
+
+    assert (plan.start_date, plan.end_date) == (datetime(2024, 1, 1), datetime(2024, 1, 3))
+    assert plan.prelude_sets == ["SET @start_date = '2024-01-01', @x = 5"]
+    assert plan.day_statements == [('SELECT * FROM t WHERE ts >= %s AND n = @x', ('start',))]
+    assert not plan.per_day
+
+
+def test_build_query_plan_reassigned_constant_set_runs_per_day():
+    plan = build_query_plan(DATE_RANGE_SETS + [
+        "SET time_zone = '+00:00'",
+        "SET @n = 0",
+        "SELECT @n := @n + 1 AS row_num, t.* FROM t WHERE ts = @start_date",
+    ])
+
+    assert plan.prelude_sets == ["SET time_zone = '+00:00'"]
+    assert plan.day_statements == [
+        ('SET @n = 0', ()),
+        ('SELECT @n := @n + 1 AS row_num, t.* FROM t WHERE ts = %s', ('start',)),
+    ]
+    assert plan.per_day
+
+
+class FakeCursor:
+    """Unbuffered cursor stand-in with a single pending result set."""
+
+    def __init__(self, description, rows):
+        self.description = description
+        self._rows = list(rows)
+
+    def fetchmany(self, size):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+
+def test_is_raw_safe():
+    assert query_runner.is_raw_safe([('id', FieldType.LONGLONG), ('d', FieldType.DATE), ('x', FieldType.NEWDECIMAL)])
+    assert not query_runner.is_raw_safe([('id', FieldType.LONG), ('name', FieldType.VAR_STRING)])
+    assert not query_runner.is_raw_safe([('flags', FieldType.BIT)])
+
+
+def test_write_result_to_csv_raw_numeric(tmp_path):
+    cursor = FakeCursor([('id', FieldType.LONG), ('d', FieldType.DATE)],
+                        [(b'1', b'2024-01-01'), (b'2', None)])
+
+    assert query_runner.write_result_to_csv(cursor, tmp_path / 'out.csv', raw=True) == 2
+    assert (tmp_path / 'out.csv').read_bytes() == b'id,d\n1,2024-01-01\n2,\n'
+
+
+@pytest.mark.parametrize('writer', sorted(query_runner.ROW_WRITERS))
+def test_write_result_to_csv_raw_text_uses_csv_module(tmp_path, writer):
+    cursor = FakeCursor([('id', FieldType.LONG), ('name', FieldType.VAR_STRING)],
+                        [(b'1', bytearray(b'john')), (b'2', b'a,b')])
+
+    assert query_runner.write_result_to_csv(cursor, tmp_path / 'out.csv', writer=writer, raw=True) == 2
+    assert (tmp_path / 'out.csv').read_bytes() == b'id,name\r\n1,john\r\n2,"a,b"\r\n'
+
+
+def test_build_query_plan_skips_leading_comments():
+    plan = build_query_plan([
+        "-- range\nSET @start_date = '2024-01-01'",
+        "/* to */ SET @end_date = '2024-01-02'",
+        "-- report\nSELECT * FROM t WHERE d = @start_date",
+    ])
+
+    assert plan.prelude_sets == []
+    assert plan.day_statements == [('-- report\nSELECT * FROM t WHERE d = %s', ('start',))]
+    assert not plan.per_day
+    assert batch_statements(plan, plan_days(plan)) == [(
+        '(-- report\nSELECT * FROM t WHERE d = %s) UNION ALL (-- report\nSELECT * FROM t WHERE d = %s)',
+        (date(2024, 1, 1), date(2024, 1, 2)),
+    )]
+
+
+def test_background_file_writer_writes_chunks_in_order(tmp_path):
+    sink = query_runner.BackgroundFileWriter(tmp_path / 'out.bin', queue_size=1)
+    for chunk in (b'a', b'bc', b'', b'd'):
+        sink.write(chunk)
+    sink.close()
+
+    assert (tmp_path / 'out.bin').read_bytes() == b'abcd'
+
+
+class FailingFile:
+    def write(self, chunk):
+        raise OSError('disk full')
+
+    def close(self):
+        pass
+
+
+def test_background_file_writer_reraises_write_errors(tmp_path):
+    sink = query_runner.BackgroundFileWriter(tmp_path / 'out.bin', queue_size=1)
+    sink._fh.close()
+    sink._fh = FailingFile()
+
+    # The writer thread keeps draining after the failure, so these writes can't block
+    for _ in range(5):
+        try:
+            sink.write(b'x')
+        except OSError:
+            break
+    with pytest.raises(OSError, match='disk full'):
+        sink.close()
+
+
+class FakeResult(FakeCursor):
+    @property
+    def with_rows(self):
+        return self.description is not None
+
+
+class FakeConnection:
+    """mysql-connector connection stand-in returning one result set per executed text."""
+
+    def __init__(self, results):
+        self.results = results
+        self.executed = []
+
+    def cursor(self, buffered=False, raw=False):
+        return FakeConnectionCursor(self)
+
+
+class FakeConnectionCursor(FakeResult):
+    def __init__(self, connection):
+        super().__init__(None, [])
+        self._connection = connection
+
+    def execute(self, sql, multi=False):
+        self._connection.executed.append(sql)
+        results = self._connection.results.pop(0)
+        if multi:
+            return iter(results)
+        self.description, self._rows = results[0].description, results[0]._rows
+
+    def close(self):
+        pass
+
+
+def test_execute_queries_to_csv_runs_call_one_at_a_time(tmp_path):
+    connection = FakeConnection([
+        [FakeResult([('a',)], [(1,)]), FakeResult([('b',)], [(2,)])],
+        [FakeResult([('c',)], [(3,)])],
+    ])
+    output_files = [tmp_path / 'q1.csv', tmp_path / 'q2.csv']
+
+    assert query_runner.execute_queries_to_csv(connection, ['CALL report()', 'SELECT 3'], output_files,
+                                               writer='csv') == 2
+    assert connection.executed == ['CALL report()', 'SELECT 3']
+    assert output_files[1].read_text() == 'c\n3\n'
+
+
+def test_execute_queries_to_csv_rejects_extra_result_sets(tmp_path):
+    connection = FakeConnection([
+        [FakeResult([('a',)], [(1,)]), FakeResult(None, []), FakeResult([('b',)], [(2,)])],
+    ])
+    output_files = [tmp_path / 'q1.csv', tmp_path / 'q2.csv']
+
+    assert query_runner.execute_queries_to_csv(connection, ['SELECT 1', 'SELECT 2'], output_files,
+                                               writer='csv') == 0
+
+
+def test_run_log_round_trip(tmp_path):
+    log_file = tmp_path / 'log.jsonl'
+    sql = "SET @start_date = '2024-01-01';\nSELECT 'é', \"x\"\n;\n" * 50
+    query_runner.append_run_log(log_file, '2024-01-01', '2024-01-01 10:00:00', '2024-01-01 10:00:01',
+                                1.0, 'success', sql)
+    query_runner.append_run_log(log_file, '2024-01-02', '2024-01-02 10:00:00', '2024-01-02 10:00:02',
+                                2.0, 'failure', 'SELECT 1')
+
+    records = [json.loads(line) for line in log_file.read_text(encoding='utf-8').splitlines()]
+
+    assert [query_runner.decode_logged_sql(record) for record in records] == [sql, 'SELECT 1']
+    assert [record['status'] for record in records] == ['success', 'failure']
+    assert records[0]['sql_query_encoding'] == 'lz4+base64'
+    assert len(records[0]['sql_query']) < len(sql)
+
+
+@pytest.mark.parametrize('total_days, batch_days, expected', [
+    (25, 1, {10, 20, 25}),
+    (30, 1, {10, 20, 30}),
+    # Day 10 is in batch 2 and day 20 in batch 3; batch 4 (days 22-25) is the last
+    (25, 7, {2, 3, 4}),
+    (20, 10, {1, 2}),
+    (5, 7, {1}),
+])
+def test_progress_checkpoints(total_days, batch_days, expected):
+    assert query_runner.progress_checkpoints(total_days, batch_days) == expected
+    assert max(expected) == len(query_runner.generate_batches(list(range(total_days)), batch_days))